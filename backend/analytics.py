@@ -1,36 +1,86 @@
 import time
+import queue
+import atexit
 import random
 import threading
+import multiprocessing
 import datetime
 import logging
+from collections import Counter, defaultdict, deque
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TrafficAI")
 
-# Try importing real AI libraries
+import numpy as np
+
+from backend.worker_ipc import AI_AVAILABLE, FrameSlot, run_camera_worker
+
+# Optional fast JSON serializer for /api/data
 try:
-    from ultralytics import YOLO
-    import cv2
-    import numpy as np
-    AI_AVAILABLE = True
-    logger.info("YOLOv8 and OpenCV detected. Real-time AI mode available.")
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    AI_AVAILABLE = False
-    logger.warning("YOLOv8/OpenCV not found. Running in MOCK/SIMULATION mode.")
+    import json
+    ORJSON_AVAILABLE = False
+
+MAX_RECORDS = 2000 # Detection records kept in memory
+STREAM_IDLE_TIMEOUT = 30 # Seconds without a new frame before a video stream is closed
+LIVE_WINDOW_SECONDS = 5 # "Live" load counts the unique track IDs seen this recently
+
+# (intensity, weighted_intensity) per congestion level, see classify_congestion()
+CONGESTION_LEVELS = [("low", 0.2), ("moderate", 0.5), ("congestion", 1.0)] # 'congestion' maps to Red
+
+def dumps_json(payload):
+    """Serializes `payload` to compact JSON bytes (orjson when installed)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+def classify_congestion(totals, lanes):
+    """
+    Lane-based congestion level (index into CONGESTION_LEVELS) for arrays of locations.
+    Green (free flow): total <= lanes * 2
+    Yellow (moderate): lanes * 2 < total <= lanes * 4
+    Red (congested): total > lanes * 4
+    """
+    return np.select([totals <= lanes * 2, totals <= lanes * 4], [0, 1], default=2)
 
 class TrafficAnalyzer:
     def __init__(self, mode="auto"):
-        self.lock = threading.Lock()
-        self.data = []
+        # Guards the detection records and counters only. Frames are published
+        # separately (see frame_slots) so streaming never waits on inference.
+        self.data_lock = threading.Lock()
+        self.data = deque(maxlen=MAX_RECORDS) # Oldest records drop off automatically
+        # Running totals over self.data, kept in step by _record()
+        self.counters = defaultdict(lambda: defaultdict(int)) # camera_id -> vehicle_type -> count
+        self.type_totals = Counter() # vehicle_type -> count
+        # Bumped whenever _record()/_mark_unique() change the data. get_latest_data()
+        # reuses its last payload (and /api/data answers 304) until it or the
+        # live-window time bucket changes, see _cache_key()
+        self.data_version = 0
+        self.boot_id = f"{time.time():.0f}" # Keeps ETags from a previous run from matching
+        self.cached_key = None
+        self.cached_payload = None
+        self.cached_json = None # (payload, serialized bytes), swapped as one reference
         # UPDATED LOCATION: 10°01'22.4"N 76°18'34.2"E -> 10.0229, 76.3095
         self.camera_config = [
             {"id": "CAM_002", "lat": 10.0229, "lng": 76.3095, "name": "Seaport-Airport Rd", "file": "traffic_cam2.mp4", "source_type": "live_cctv", "lanes": 8}
         ]
-        self.unique_ids = set() # Store unique vehicle track IDs
+        self.cam_by_id = {c["id"]: c for c in self.camera_config}
+        # Unique vehicle track IDs as a byte-per-ID map (IDs are small, increasing ints),
+        # plus a running count so the total never needs a scan. One map per camera:
+        # every camera has its own tracker, and each one numbers its IDs from 1.
+        self.unique_bitmaps = {c["id"]: np.zeros(1 << 20, dtype=np.uint8) for c in self.camera_config}
+        self.unique_count = 0
         self.vehicle_types = ["car", "bike", "bus", "truck"]
         self.running = True
-        self.current_frames = {} # Store latest JPG bytes for each camera
+        # Latest JPG bytes for each camera, shared with the camera worker process,
+        # plus a local condition per camera notified by _watch_frames (real mode only)
+        self.frame_slots = {}
+        self.frame_conditions = {}
+        self.viewer_lock = threading.Lock() # Guards stream_viewers and viewers_present
+        self.viewers_present = threading.Event() # Set while at least one stream is open
         
         # Decide mode
         if mode == "real" and not AI_AVAILABLE:
@@ -46,6 +96,7 @@ class TrafficAnalyzer:
         # Initialize Dummy Nodes (Simulated Data)
         # Initialize Dummy Nodes (Simulated Data on Roads)
         self.dummy_nodes = []
+        self.rng = np.random.default_rng() # Vectorized random draws for the simulated nodes
         
         # Hardcoded coordinates to align with actual roads near 10.025, 76.312
         # Roughly representing a North-South and East-West intersection pattern
@@ -75,14 +126,10 @@ class TrafficAnalyzer:
                 "source_type": "simulated_cctv"
             })
 
-        # Initialize AI
-        self.model = None
+        # Initialize AI: the model and video sources live in a separate worker process
+        # so decoding, inference and annotation never hold this process's GIL
         if self.mode == "real":
-            try:
-                self.model = YOLO('yolov8n.pt') 
-            except Exception as e:
-                logger.error(f"Failed to load YOLO model: {e}")
-                self.mode = "mock"
+            self._start_worker()
 
         self.thread = threading.Thread(target=self._run_pipeline)
         self.thread.daemon = True
@@ -126,147 +173,185 @@ class TrafficAnalyzer:
 
     def _run_pipeline(self):
         if self.mode == "real":
-            self._process_cameras()
+            self._consume_worker_events()
         else:
             self._generate_mock_stream()
 
-    def _process_cameras(self):
-        """
-        Multi-Camera Real AI Pipeline.
-        Round-robin processing of all configured video files.
-        """
-        import os
-        import cv2 # Ensure cv2 is available in this scope
-
-        caps = {}
+    def _start_worker(self):
+        # "spawn" keeps CUDA state out of this process and works on every OS.
+        # run_camera_worker imports the AI libraries in the child only.
+        ctx = multiprocessing.get_context("spawn")
         for cam in self.camera_config:
-            src = cam["file"]
-            
-            # Check file existence and perform smart fallback
-            if not os.path.exists(src):
-                logger.warning(f"Video source '{src}' for {cam['id']} not found.")
-                if os.path.exists("traffic.mov"): 
-                     logger.warning("Falling back to default 'traffic.mov'.")
-                     src = "traffic.mov"
-                else:
-                     logger.error(f"No valid video source found for {cam['id']} (and no fallback). Skipping.")
-                     continue 
-            
-            cap = cv2.VideoCapture(src)
-            if cap.isOpened():
-                caps[cam["id"]] = cap
-                logger.info(f"Initialized {cam['id']} with source {src}")
+            self.frame_slots[cam["id"]] = FrameSlot()
+            self.frame_conditions[cam["id"]] = threading.Condition()
+
+        # Released by the worker after each published tick while stream_viewers > 0.
+        # Unlike Condition/Event notify, release() never waits for the waiter.
+        self.frame_ready = ctx.Semaphore(0)
+        self.stream_viewers = ctx.RawValue("i", 0) # Written here only, read by the worker
+        self.worker_events = ctx.Queue()
+        self.worker_stop = ctx.Event()
+        self.worker = ctx.Process(
+            target=run_camera_worker,
+            args=(self.camera_config, self.vehicle_types,
+                  {cam_id: slot.name for cam_id, slot in self.frame_slots.items()},
+                  self.frame_ready, self.stream_viewers,
+                  self.worker_events, self.worker_stop),
+            name="TrafficAI-Worker",
+            daemon=True
+        )
+        self.worker.start()
+        atexit.register(self._stop_worker)
+
+        # The worker never waits on streamers: one thread here watches the slots
+        # and wakes the streaming threads of this process
+        self.frame_watcher = threading.Thread(target=self._watch_frames, name="TrafficAI-FrameWatcher")
+        self.frame_watcher.daemon = True
+        self.frame_watcher.start()
+
+    def _stop_worker(self):
+        self.running = False
+        self.worker_stop.set()
+        self.frame_watcher.join(timeout=1.0) # Stop polling before the slots go away
+        for slot in self.frame_slots.values():
+            slot.close()
+            slot.unlink()
+
+    def _watch_frames(self):
+        """Wakes streamers when the worker publishes frames, idles while nobody is streaming."""
+        published = {cam_id: 0 for cam_id in self.frame_slots}
+        while self.running and self.mode == "real" and self.worker.is_alive():
+            if not self.viewers_present.wait(timeout=1.0):
+                continue
+            if not self.frame_ready.acquire(timeout=1.0) or not self.running:
+                continue # Re-checked so the slots are never read once _stop_worker runs
+            for cam_id, slot in self.frame_slots.items():
+                frame = slot.frame_number()
+                if frame != published[cam_id]:
+                    published[cam_id] = frame
+                    with self.frame_conditions[cam_id]:
+                        self.frame_conditions[cam_id].notify_all()
+
+    def _add_viewer(self, delta):
+        """Counts open MJPEG streams, the worker only signals frames while there are any."""
+        with self.viewer_lock:
+            self.stream_viewers.value += delta
+            if self.stream_viewers.value > 0:
+                self.viewers_present.set()
             else:
-                logger.warning(f"Failed to open source for {cam['id']}")
-
-        frame_interval = 3 # Process every Nth frame to save CPU
-        frame_count = 0
-        cached_annotated_frames = {}  # Store last annotated frame per camera
+                self.viewers_present.clear()
 
+    def _consume_worker_events(self):
+        """Applies detections reported by the camera worker to the data store."""
         while self.running:
-            keys = list(caps.keys())
-            for cam_id in keys:
-                cap = caps[cam_id]
-                ret, frame = cap.read()
-                
-                if not ret:
-                    # Loop video
-                    logger.debug(f"Looping {cam_id}")
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    continue
-                
-                # Resize for speed (optional, but good for CPU)
-                # Increased to 1024x576 for better detection of small vehicles
-                frame = cv2.resize(frame, (1024, 576))
-
-                # Frame Skipping Logic
-                frame_count += 1
-                should_run_ai = (frame_count % frame_interval == 0)
-
-                # Use cached annotated frame by default (keeps boxes visible)
-                annotated_frame = cached_annotated_frames.get(cam_id, frame)
-
-                if should_run_ai:
-                    # Run Tracking with lowered confidence to catch more vehicles
-                    results = self.model.track(frame, persist=True, verbose=False, conf=0.15)
-                    annotated_frame = results[0].plot()
-                    # Cache this annotated frame
-                    cached_annotated_frames[cam_id] = annotated_frame
-
-                    # Count Logic
-                    current_counts = {v: 0 for v in self.vehicle_types}
-                    current_ids = {v: [] for v in self.vehicle_types} # Store list of IDs per type
-                    
-                    if results[0].boxes.id is not None:
-                        boxes = results[0].boxes
-                        track_ids = boxes.id.int().cpu().tolist()
-                        clss = boxes.cls.int().cpu().tolist()
-
-                        for track_id, cls_id in zip(track_ids, clss):
-                            # Add to unique set (global)
-                            self.unique_ids.add(track_id)
-                            
-                            label = self.model.names[cls_id].lower()
-                            if label in ['car', 'motorcycle', 'bus', 'truck']:
-                                type_key = label if label != 'motorcycle' else 'bike'
-                                current_counts[type_key] += 1
-                                current_ids[type_key].append(track_id) # Store ID
-                    
-                    # Update Data Store
-                    with self.lock:
-                        timestamp = datetime.datetime.now().isoformat()
-                        if sum(current_counts.values()) > 0:
-                            for v_type, count in current_counts.items():
-                                if count > 0:
-                                    self.data.append({
-                                        "camera_id": cam_id,
-                                        "camera_name": next(c['name'] for c in self.camera_config if c['id'] == cam_id),
-                                        "lat": next(c['lat'] for c in self.camera_config if c['id'] == cam_id),
-                                        "lng": next(c['lng'] for c in self.camera_config if c['id'] == cam_id),
-                                        "vehicle_type": v_type,
-                                        "count": count,
-                                        "track_ids": current_ids[v_type], # Save the IDs!
-                                        "timestamp": timestamp
-                                    })
-                        # Prune Data
-                        if len(self.data) > 2000: self.data.pop(0)
-
-                # Overlay Timestamp
-                cv2.putText(annotated_frame, datetime.datetime.now().strftime("%H:%M:%S"), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    
-                # Store Frame for Streaming (Always update this to keep feed smooth)
-                ret, buffer = cv2.imencode('.jpg', annotated_frame)
-                with self.lock:
-                    self.current_frames[cam_id] = buffer.tobytes()
-                    
-                    # Prune Data
-                    if len(self.data) > 2000: self.data.pop(0)
+            try:
+                event = self.worker_events.get(timeout=1.0)
+            except queue.Empty:
+                if not self.worker.is_alive():
+                    logger.error("Camera worker exited unexpectedly.")
+                    break
+                continue
+
+            if event[0] == "failed":
+                break
+            if event[0] == "ready":
+                logger.info(f"Camera worker running with {event[1]}")
+                continue
+
+            _, cam_id, timestamp, current_counts, current_ids, track_ids = event
+
+            # Update Data Store
+            cam = self.cam_by_id[cam_id]
+            with self.data_lock:
+                # Add to this camera's unique set
+                self._mark_unique(cam_id, track_ids)
+                for v_type, count in current_counts.items():
+                    if count > 0:
+                        self._record({
+                            "camera_id": cam_id,
+                            "camera_name": cam['name'],
+                            "lat": cam['lat'],
+                            "lng": cam['lng'],
+                            "vehicle_type": v_type,
+                            "count": count,
+                            "track_ids": current_ids[v_type], # Save the IDs!
+                            "timestamp": timestamp
+                        })
+
+        if self.running:
+            logger.error("Real AI pipeline unavailable. Fallback to mock.")
+            self.mode = "mock"
+            self._generate_mock_stream()
 
-            time.sleep(0.016) # Yield CPU and limit to ~60 FPS
+    def _mark_unique(self, cam_id, track_ids):
+        """Adds a camera's track IDs to its unique bitmap. Caller holds self.data_lock."""
+        if not track_ids:
+            return
+        ids = np.unique(np.asarray(track_ids, dtype=np.int64))
+        bitmap = self.unique_bitmaps[cam_id]
+        if ids[-1] >= len(bitmap):
+            # Long sessions can outgrow the initial map, double it until the ID fits
+            size = len(bitmap)
+            while size <= ids[-1]:
+                size *= 2
+            bitmap = self.unique_bitmaps[cam_id] = np.concatenate([bitmap, np.zeros(size - len(bitmap), dtype=np.uint8)])
+        new_ids = ids[bitmap[ids] == 0]
+        bitmap[new_ids] = 1
+        self.unique_count += len(new_ids)
+        if len(new_ids):
+            self.data_version += 1
+
+    def _record(self, entry):
+        """Appends a detection record and updates the running counters. Caller holds self.data_lock."""
+        # The deque is about to drop its oldest record, take it back out of the totals
+        if len(self.data) == self.data.maxlen:
+            old = self.data[0]
+            self.counters[old['camera_id']][old['vehicle_type']] -= old['count']
+            self.type_totals[old['vehicle_type']] -= old['count']
+
+        self.data.append(entry)
+        self.counters[entry['camera_id']][entry['vehicle_type']] += entry['count']
+        self.type_totals[entry['vehicle_type']] += entry['count']
+        self.data_version += 1
 
     def generate_frames(self, camera_id):
-        """Yields latest frame for specific camera."""
-        while True:
-            with self.lock:
-                frame = self.current_frames.get(camera_id)
-            
-            if frame:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            else:
-                # If no frame yet, yield empty or waiting logic
-                pass
-                
-            time.sleep(0.05)
+        """Yields latest frame for specific camera as soon as it is published."""
+        slot = self.frame_slots.get(camera_id)
+        if slot is None:
+            return # Unknown camera, or no video in mock mode
+        condition = self.frame_conditions[camera_id]
+
+        self._add_viewer(1)
+        try:
+            last_frame = -1
+            idle_seconds = 0
+            # Ends once the worker is gone (mock fallback) or stops publishing. A stream
+            # with no frame to send never writes, so it would never notice a disconnect
+            # and would hold one of the server's fixed pool of threads for good.
+            while self.running and self.mode == "real":
+                with condition:
+                    # Times out once a second so idle streams still get a keep-alive frame
+                    new_frame = condition.wait_for(lambda: not self.running or slot.frame_number() != last_frame, timeout=1.0)
+                if not self.running:
+                    return # _stop_worker is releasing the slots
+                idle_seconds = 0 if new_frame else idle_seconds + 1
+                if idle_seconds >= STREAM_IDLE_TIMEOUT:
+                    logger.info(f"No frames from {camera_id} for {STREAM_IDLE_TIMEOUT}s, closing stream.")
+                    return
+                last_frame, frame = slot.read()
+
+                if frame:
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            self._add_viewer(-1)
     
     # ... mock stream methods below can remain or be ignored if we always run real ...
     def _generate_mock_stream(self):
         """Generates continuous traffic data for demo purposes."""
         while self.running:
-            with self.lock:
+            with self.data_lock:
                 self._generate_mock_data_for_other_cams([c["id"] for c in self.camera_config])
-                # Prune
-                if len(self.data) > 1000: self.data.pop(0)
             
             time.sleep(2) # Update every 2 seconds
 
@@ -290,32 +375,62 @@ class TrafficAnalyzer:
                     "count": count,
                     "timestamp": timestamp
                 }
-                self.data.append(entry)
+                self._record(entry)
+
+    def _cache_key(self):
+        """
+        (data_version, time bucket) the payload was built for. Records also age out
+        of the live window with no new data, so the payload is rebuilt at least
+        once per LIVE_WINDOW_SECONDS.
+        """
+        return self.data_version, int(time.time()) // LIVE_WINDOW_SECONDS
+
+    def current_etag(self):
+        """ETag for the /api/data payload, changes whenever _cache_key() does."""
+        version, bucket = self._cache_key()
+        return f"{self.boot_id}-{version}-{bucket}"
+
+    def get_latest_json(self):
+        """get_latest_data() as JSON bytes, serialized once per rebuilt payload."""
+        payload = self.get_latest_data()
+        cached = self.cached_json
+        if cached is None or cached[0] is not payload:
+            cached = (payload, dumps_json(payload))
+            self.cached_json = cached
+        return cached[1]
 
     def get_latest_data(self):
-        with self.lock:
+        with self.data_lock:
+            # Nothing changed since the last call, reuse that payload
+            cache_key = self._cache_key()
+            if self.cached_key == cache_key:
+                return self.cached_payload
+
             # Return a summary for the dashboard
-            total_vehicles = len(self.unique_ids)
+            total_vehicles = self.unique_count
             
             # Aggregation by vehicle type
-            by_type = {v: 0 for v in self.vehicle_types}
-            for d in self.data:
-                by_type[d['vehicle_type']] += d['count']
-                
+            by_type = {v: self.type_totals[v] for v in self.vehicle_types}
+
+            # Get current "live" count (Unique Track IDs in last 5 seconds)
+            # This is the most robust method. It counts how many UNIQUE vehicles (by ID)
+            # have been seen in the recent window.
+            now = datetime.datetime.now()
+            recent_window = datetime.timedelta(seconds=LIVE_WINDOW_SECONDS)
+
+            # Records are appended in time order, so walk back from the newest
+            # and stop at the first one outside the window
+            recent_by_camera = defaultdict(list)
+            for d in reversed(self.data):
+                if (now - datetime.datetime.fromisoformat(d['timestamp'])) >= recent_window:
+                    break
+                recent_by_camera[d['camera_id']].append(d)
+
             # Aggregation by camera (for map)
             by_camera = {}
             for cam in self.camera_config:
-                cam_data = [d for d in self.data if d['camera_id'] == cam['id']]
-                
-                # Get current "live" count (Unique Track IDs in last 5 seconds)
-                # This is the most robust method. It counts how many UNIQUE vehicles (by ID)
-                # have been seen in the recent window.
-                
-                now = datetime.datetime.now()
-                recent_window = datetime.timedelta(seconds=5)
-                
                 # Filter data for this camera from the last 5 seconds
-                recent_data = [d for d in self.data if d['camera_id'] == cam['id'] and (now - datetime.datetime.fromisoformat(d['timestamp'])) < recent_window]
+                recent_data = recent_by_camera[cam['id']]
                 
                 current_load = 0
                 if recent_data:
@@ -352,68 +467,59 @@ class TrafficAnalyzer:
                     "name": cam['name'],
                     "total": current_load, # Use calculated MAX load
                     "lanes": cam.get("lanes", 2), # Default to 2 if missing
-                    "breakdown": {v: sum(d['count'] for d in cam_data if d['vehicle_type'] == v) for v in self.vehicle_types} 
+                    "breakdown": {v: self.counters[cam['id']][v] for v in self.vehicle_types}
                     # Note: Breakdown is still cumulative from buffer, which is fine for charts, but 'total' is live load
                 }
 
+            # Ensure real camera data has source_type derived from config
+            for cam_id, loc in by_camera.items():
+                loc['source_type'] = self.cam_by_id[cam_id].get('source_type', 'live_cctv')
+            real_locations = list(by_camera.values())
+
+            # --- Logic: Lane-Based Congestion ---
+            real_levels = classify_congestion(
+                np.array([loc['total'] for loc in real_locations]),
+                np.array([loc['lanes'] for loc in real_locations])
+            )
+            for loc, level in zip(real_locations, real_levels.tolist()):
+                loc['intensity'], loc['weighted_intensity'] = CONGESTION_LEVELS[level]
+
             # Generate Simulated Data (with Source Type)
+            # Random traffic intensity for all nodes at once, assume 2 lanes for dummy roads
+            dummy_counts = self.rng.integers(5, 51, size=len(self.dummy_nodes))
+            dummy_levels = classify_congestion(dummy_counts, 2)
             current_dummy_data = []
-            for node in self.dummy_nodes:
-                # Random traffic intensity
-                count = random.randint(5, 50) 
-                
-                heading = node.copy()
-                heading.update({
+            for node, count, level in zip(self.dummy_nodes, dummy_counts.tolist(), dummy_levels.tolist()):
+                intensity, weighted_intensity = CONGESTION_LEVELS[level]
+                current_dummy_data.append({
+                    **node,
                     "total": count,
-                     "lanes": 2, # Assume 2 lanes for dummy roads
+                    "lanes": 2,
                     "breakdown": {"car": count, "bike": 0, "bus": 0, "truck": 0},
-                    "source_type": "simulated_cctv"
+                    "intensity": intensity,
+                    "weighted_intensity": weighted_intensity
                 })
-                current_dummy_data.append(heading)
 
             # Combine real and simulated data
-            # Ensure real camera data has source_type derived from config
-            real_locations = list(by_camera.values())
-            for loc in real_locations:
-                 loc['source_type'] = next((c['source_type'] for c in self.camera_config if c['name'] == loc['name']), 'live_cctv')
-
             all_locations = real_locations + current_dummy_data
-            
-            if not all_locations:
-                return {"total_vehicles": total_vehicles, "distribution": by_type, "locations": []}
 
-            # --- Logic: Lane-Based Congestion ---
-            # Green (free flow): total_vehicles <= lanes * 2
-            # Yellow (moderate): lanes * 2 < total_vehicles <= lanes * 4
-            # Red (congested): total_vehicles > lanes * 4
-            
-            for loc in all_locations:
-                val = loc['total']
-                lanes = loc.get('lanes', 2)
-                
-                threshold_green = lanes * 2
-                threshold_yellow = lanes * 4
-                
-                if val <= threshold_green:
-                    loc['intensity'] = 'low'
-                    loc['weighted_intensity'] = 0.2
-                elif val <= threshold_yellow:
-                    loc['intensity'] = 'moderate'
-                    loc['weighted_intensity'] = 0.5
-                else:
-                    loc['intensity'] = 'congestion' # Using 'congestion' map to Red
-                    loc['weighted_intensity'] = 1.0
+            if not all_locations:
+                self.cached_payload = {"total_vehicles": total_vehicles, "distribution": by_type, "locations": []}
+                self.cached_key = cache_key
+                return self.cached_payload
 
             # Set dashboard total to the specific live camera count (CAM_002)
             # This replaces the cumulative total with the "Current Vehicles in Frame"
             live_cam_data = by_camera.get("CAM_002")
             dashboard_total = live_cam_data['total'] if live_cam_data else 0
 
-            return {
+            self.cached_payload = {
                 "total_vehicles": dashboard_total,
                 "distribution": by_type,
                 "locations": all_locations
             }
+            self.cached_key = cache_key
+            return self.cached_payload
 
     def get_historical_data(self, time_slot):
         """
@@ -456,9 +562,10 @@ class TrafficAnalyzer:
             })
             
         # Dummy Nodes (Simulated Roads)
-        for node in self.dummy_nodes:
-            # Smaller roads, base load ~30
-            load = get_load(30)
+        # Smaller roads, base load ~30, same as get_load(30) but drawn for all nodes at once
+        variation = self.rng.integers(-10, 11, size=len(self.dummy_nodes))
+        loads = np.maximum(0, (30 * intensity_factor + variation).astype(int))
+        for node, load in zip(self.dummy_nodes, loads.tolist()):
             heatmap_points.append({
                 "lat": node['lat'],
                 "lng": node['lng'],
@@ -494,4 +601,5 @@ class TrafficAnalyzer:
             "period_label": profile["label"]
         }
 
-traffic_system = TrafficAnalyzer(mode="auto")
+# The spawned camera worker re-imports the main module, it must not start its own analyzer
+traffic_system = TrafficAnalyzer(mode="auto") if multiprocessing.parent_process() is None else None
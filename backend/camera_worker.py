@@ -0,0 +1,411 @@
+import os
+import math
+import time
+import datetime
+import logging
+
+import numpy as np
+
+from backend.worker_ipc import FRAME_SIZE, FrameSlot
+
+# Only ever imported inside the worker process (see worker_ipc.run_camera_worker),
+# so torch, CUDA and OpenCL are never initialized in the web process.
+
+# Configure logging (the worker runs in its own process)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TrafficAI")
+
+# Try importing real AI libraries
+try:
+    from ultralytics import YOLO
+    from ultralytics.utils.plotting import colors
+    import cv2
+    AI_AVAILABLE = True
+    logger.info("YOLOv8 and OpenCV detected. Real-time AI mode available.")
+except ImportError:
+    AI_AVAILABLE = False
+    logger.warning("YOLOv8/OpenCV not found. Running in MOCK/SIMULATION mode.")
+
+# OpenCV Transparent API: run cv2 work on UMat through OpenCL when a device exists
+OPENCL_AVAILABLE = AI_AVAILABLE and cv2.ocl.haveOpenCL()
+if OPENCL_AVAILABLE:
+    cv2.ocl.setUseOpenCL(True)
+    logger.info("OpenCL detected. CPU-decoded frames will be resized through cv2.UMat.")
+
+# Optional GPU video decode (NVDEC) through torchcodec. Besides ImportError, the
+# import raises OSError for a build against another torch ABI and RuntimeError
+# (older releases) when the FFmpeg shared libraries are missing.
+try:
+    import torch
+    from torchcodec.decoders import VideoDecoder
+    NVDEC_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVDEC_AVAILABLE = False
+except Exception as e:
+    NVDEC_AVAILABLE = False
+    logger.warning(f"torchcodec failed to load ({e}). Video decode stays on the CPU.")
+
+if NVDEC_AVAILABLE:
+    logger.info("torchcodec + CUDA detected. Video decode will run on NVDEC.")
+
+# Optional GPU JPEG encode (nvJPEG) through torchvision
+try:
+    import torch
+    from torchvision.io import encode_jpeg
+    NVJPEG_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    NVJPEG_AVAILABLE = False
+except Exception as e: # e.g. torchvision built for another torch version
+    NVJPEG_AVAILABLE = False
+    logger.warning(f"torchvision failed to load ({e}). JPEG encode stays on the CPU.")
+
+JPEG_QUALITY = 80
+
+MODEL_WEIGHTS = "yolov8n.pt"
+MODEL_ENGINE = "yolov8n.engine" # TensorRT export, built by download_assets.py
+ENGINE_MAX_BATCH = 4 # Dynamic batch limit the engine is exported with (same name in download_assets.py)
+MAX_FRAME_INTERVAL = 10 # Run inference at least every 10th frame, however slow it gets
+
+def select_model_path():
+    """Prefer the TensorRT engine when it exists and a CUDA device is present."""
+    if not os.path.exists(MODEL_ENGINE):
+        return MODEL_WEIGHTS
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return MODEL_ENGINE
+    except ImportError:
+        pass
+    logger.warning(f"Found {MODEL_ENGINE} but no CUDA device. Using {MODEL_WEIGHTS}.")
+    return MODEL_WEIGHTS
+
+def predict_batch(model, frames, **kwargs):
+    """model.predict() over `frames` in chunks of at most ENGINE_MAX_BATCH."""
+    results = []
+    for i in range(0, len(frames), ENGINE_MAX_BATCH):
+        results.extend(model.predict(frames[i:i + ENGINE_MAX_BATCH], verbose=False, **kwargs))
+    return results
+
+class NvdecCapture:
+    """
+    Drop-in stand-in for cv2.VideoCapture that decodes on the GPU (NVDEC).
+    Frames are resized on the GPU and come back as BGR numpy arrays of `size`,
+    so the rest of the pipeline (and the cv2.resize check) stays unchanged.
+    """
+    def __init__(self, src, size=FRAME_SIZE):
+        self.decoder = VideoDecoder(src, device="cuda")
+        self.num_frames = len(self.decoder)
+        self.size = size
+        self.index = 0
+
+    def isOpened(self):
+        return self.decoder is not None and self.num_frames > 0
+
+    def read(self):
+        if self.index >= self.num_frames:
+            return False, None
+        frame = self.decoder[self.index] # (3, H, W) uint8 RGB on the GPU
+        self.index += 1
+
+        width, height = self.size
+        frame = torch.nn.functional.interpolate(
+            frame.unsqueeze(0).float(), size=(height, width), mode="bilinear", antialias=True
+        )
+        # RGB -> BGR and CHW -> HWC before the single device-to-host copy
+        frame = frame.squeeze(0).clamp_(0, 255).byte().flip(0).permute(1, 2, 0).contiguous()
+        return True, frame.cpu().numpy()
+
+    def grab(self):
+        # Skip a frame without decoding it
+        self.index += 1
+        return self.index <= self.num_frames
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.decoder.metadata.average_fps or 0
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.index = int(value)
+            return True
+        return False
+
+    def release(self):
+        self.decoder = None
+
+def open_cpu_capture(src):
+    """cv2.VideoCapture pinned to the FFmpeg backend, same decoder on every OS."""
+    cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(src) # OpenCV build without the FFmpeg backend
+    # One-frame buffer for live backends (e.g. V4L2); FFmpeg ignores it for files
+    if not cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+        logger.debug(f"Capture backend for {src} ignores CAP_PROP_BUFFERSIZE.")
+    return cap
+
+def open_video_source(src):
+    """Opens `src` on NVDEC when available, otherwise with cv2.VideoCapture."""
+    if NVDEC_AVAILABLE:
+        try:
+            return NvdecCapture(src)
+        except Exception as e:
+            logger.warning(f"NVDEC decode failed for {src} ({e}), using CPU decode.")
+    return open_cpu_capture(src)
+
+def rewind_video_source(cap, src):
+    """Loops a finished source back to its first frame, returns the capture to use from now on."""
+    if isinstance(cap, NvdecCapture):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Just an index reset
+        return cap
+    # Reopening avoids CAP_PROP_POS_FRAMES seeks, which can stall for 100+ ms
+    cap.release()
+    return open_cpu_capture(src)
+
+def resize_frame(frame):
+    """Resizes a decoded BGR frame to FRAME_SIZE (OpenCL via cv2.UMat when available)."""
+    if frame.shape[1::-1] == FRAME_SIZE:
+        return frame # NVDEC frames already come back at FRAME_SIZE
+    if OPENCL_AVAILABLE:
+        # Downloaded straight away: the model and the annotator both need a host array
+        return cv2.resize(cv2.UMat(frame), FRAME_SIZE).get()
+    return cv2.resize(frame, FRAME_SIZE)
+
+def encode_frame(frame):
+    """
+    JPEG-encodes a BGR frame for the MJPEG stream.
+    Uses nvJPEG on the GPU when available, libjpeg (cv2.imencode) otherwise.
+    """
+    global NVJPEG_AVAILABLE
+    if NVJPEG_AVAILABLE:
+        try:
+            # BGR HWC -> RGB CHW on the device, then pull back the encoded bytes only
+            tensor = torch.from_numpy(frame).to("cuda", non_blocking=True)
+            tensor = tensor.flip(2).permute(2, 0, 1).contiguous()
+            return encode_jpeg(tensor, quality=JPEG_QUALITY).cpu().numpy().tobytes()
+        except Exception as e:
+            # e.g. torchvision < 0.19 has no CUDA encode_jpeg
+            logger.warning(f"nvJPEG encode failed ({e}), falling back to cv2.imencode.")
+            NVJPEG_AVAILABLE = False
+
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return buffer.tobytes()
+
+def create_tracker(tracker_cfg="botsort.yaml", frame_rate=30):
+    """
+    Builds a standalone Ultralytics tracker, the same one model.track() uses.
+    model.track() keeps a single tracker for a list of images, so batched
+    multi-camera inference needs one of these per camera instead.
+    """
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml(tracker_cfg))
+    except ImportError: # older ultralytics releases
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml(tracker_cfg))
+    args = IterableSimpleNamespace(**cfg)
+    return TRACKER_MAP[args.tracker_type](args=args, frame_rate=frame_rate)
+
+def apply_tracker(tracker, result):
+    """Mirrors Ultralytics' track callback: returns `result` with track IDs attached."""
+    tracks = tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+    if len(tracks) == 0:
+        return result
+    result = result[tracks[:, -1].astype(int)]
+    result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return result
+
+def draw_detections(frame, xyxy, clss, track_ids, names):
+    """
+    Draws boxes and labels straight onto `frame`, in place. Stand-in for
+    Results.plot(), which copies the image and runs the generic Annotator per box.
+    """
+    labels = [f"id:{t} {names[c]}" for t, c in zip(track_ids, clss)] if track_ids else [names[c] for c in clss]
+    for (x1, y1, x2, y2), cls_id, label in zip(xyxy.tolist(), clss, labels):
+        color = colors(cls_id, True) # Same class palette as Results.plot()
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, label, (x1, max(y1 - 6, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+    return frame
+
+class CameraWorker:
+    """
+    Owns the video sources and the YOLO model, runs in a separate process.
+    Annotated frames go to FrameSlots, detections go to `events` as tuples:
+        ("ready", model_path) / ("failed", reason)
+        ("detections", camera_id, timestamp, counts, ids, track_ids)
+    While `stream_viewers` is above zero, `frame_ready` is released once per
+    published tick. Releasing a semaphore never waits on the other side.
+    """
+    def __init__(self, camera_config, vehicle_types, slot_names, frame_ready, stream_viewers, events, stop_event):
+        self.camera_config = camera_config
+        self.vehicle_types = vehicle_types
+        self.frame_slots = {cam_id: FrameSlot(name) for cam_id, name in slot_names.items()}
+        self.frame_ready = frame_ready
+        self.stream_viewers = stream_viewers
+        self.events = events
+        self.stop_event = stop_event
+
+    def _load_model(self, model_path):
+        """
+        Loads `model_path` and runs one warmup predict on blank frames.
+        YOLO() is lazy: the predictor (engine deserialization, CUDA context, warmup)
+        is only built on the first predict() and takes seconds. Paying for it here
+        keeps it out of the frame_interval estimate and surfaces a broken engine.
+        """
+        model = YOLO(model_path, task="detect")
+        blank = np.zeros((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+        predict_batch(model, [blank] * min(max(len(self.camera_config), 1), ENGINE_MAX_BATCH))
+        return model
+
+    def run(self):
+        try:
+            model_path = select_model_path()
+            try:
+                self.model = self._load_model(model_path)
+            except Exception as e:
+                if model_path != MODEL_ENGINE:
+                    raise
+                # Engines go stale after GPU, driver or TensorRT changes
+                logger.warning(f"Failed to load {MODEL_ENGINE} ({e}). Using {MODEL_WEIGHTS}, re-run download_assets.py to rebuild it.")
+                model_path = MODEL_WEIGHTS
+                self.model = self._load_model(model_path)
+            logger.info(f"Loaded detection model from {model_path}")
+        except Exception as e:
+            logger.error(f"Failed to load YOLO model: {e}")
+            self.events.put(("failed", str(e)))
+            return
+
+        self.events.put(("ready", model_path))
+        try:
+            self._process_cameras()
+        finally:
+            for slot in self.frame_slots.values():
+                slot.close()
+
+    def _process_cameras(self):
+        """
+        Multi-Camera Real AI Pipeline.
+        Round-robin processing of all configured video files.
+        """
+        caps = {}
+        sources = {} # Resolved path per camera, for reopening on loop
+        for cam in self.camera_config:
+            src = cam["file"]
+
+            # Check file existence and perform smart fallback
+            if not os.path.exists(src):
+                logger.warning(f"Video source '{src}' for {cam['id']} not found.")
+                if os.path.exists("traffic.mov"):
+                     logger.warning("Falling back to default 'traffic.mov'.")
+                     src = "traffic.mov"
+                else:
+                     logger.error(f"No valid video source found for {cam['id']} (and no fallback). Skipping.")
+                     continue
+
+            cap = open_video_source(src)
+            if cap.isOpened():
+                caps[cam["id"]] = cap
+                sources[cam["id"]] = src
+                logger.info(f"Initialized {cam['id']} with source {src}")
+            else:
+                logger.warning(f"Failed to open source for {cam['id']}")
+
+        # Process every Nth frame to save CPU. Retuned from the measured inference
+        # time so inference keeps pace with the source instead of falling behind.
+        frame_interval = 3
+        frame_count = 0
+        infer_ms_ewma = None
+        source_fps = max([cap.get(cv2.CAP_PROP_FPS) or 0 for cap in caps.values()] + [0]) or 30
+        cached_annotated_frames = {}  # Store last annotated frame per camera
+        # One tracker per camera: a shared one would mix track IDs across feeds
+        trackers = {cam_id: create_tracker() for cam_id in caps}
+
+        while not self.stop_event.is_set():
+            # Frame Skipping Logic
+            frame_count += 1
+            should_run_ai = (frame_count % frame_interval == 0)
+
+            # Grab the next frame from every camera
+            frames = {}
+            for cam_id, cap in caps.items():
+                if not should_run_ai and cam_id in cached_annotated_frames:
+                    # Neither inferred nor shown (the cached annotation is), only advance the source
+                    ret, frame = cap.grab(), None
+                else:
+                    ret, frame = cap.read()
+
+                if not ret:
+                    # Loop video
+                    logger.debug(f"Looping {cam_id}")
+                    cap = caps[cam_id] = rewind_video_source(cap, sources[cam_id])
+                    ret, frame = cap.read()
+                    if not ret:
+                        continue
+
+                # Resize for speed (optional, but good for CPU)
+                # Increased to 1024x576 for better detection of small vehicles
+                frames[cam_id] = resize_frame(frame) if frame is not None else None
+
+            # One clock read per tick, shared by the records and the overlay
+            now = datetime.datetime.now()
+            timestamp = now.isoformat()
+            clock_text = now.strftime("%H:%M:%S")
+
+            if should_run_ai and frames:
+                infer_start = time.perf_counter()
+                # Batched forward passes for all cameras, lowered confidence to catch more vehicles
+                cam_ids = list(frames)
+                results = predict_batch(self.model, [frames[c] for c in cam_ids], conf=0.15)
+
+                for cam_id, result in zip(cam_ids, results):
+                    result = apply_tracker(trackers[cam_id], result)
+                    boxes = result.boxes
+                    xyxy = boxes.xyxy.cpu().numpy().astype(np.int32)
+                    clss = boxes.cls.int().cpu().tolist()
+                    track_ids = boxes.id.int().cpu().tolist() if boxes.id is not None else []
+
+                    annotated_frame = draw_detections(frames[cam_id], xyxy, clss, track_ids, self.model.names)
+                    # Cache this annotated frame
+                    cached_annotated_frames[cam_id] = annotated_frame
+
+                    # Count Logic
+                    current_counts = {v: 0 for v in self.vehicle_types}
+                    current_ids = {v: [] for v in self.vehicle_types} # Store list of IDs per type
+
+                    if track_ids:
+                        for track_id, cls_id in zip(track_ids, clss):
+                            label = self.model.names[cls_id].lower()
+                            if label in ['car', 'motorcycle', 'bus', 'truck']:
+                                type_key = label if label != 'motorcycle' else 'bike'
+                                current_counts[type_key] += 1
+                                current_ids[type_key].append(track_id) # Store ID
+
+                    # Hand the counts to the web process (all track IDs feed the unique set)
+                    self.events.put(("detections", cam_id, timestamp, current_counts, current_ids, track_ids))
+
+                # Moving average of the inference step, then the smallest interval that keeps up
+                infer_ms = (time.perf_counter() - infer_start) * 1000
+                infer_ms_ewma = infer_ms if infer_ms_ewma is None else 0.9 * infer_ms_ewma + 0.1 * infer_ms
+                new_interval = min(MAX_FRAME_INTERVAL, max(1, math.ceil(infer_ms_ewma * source_fps / 1000)))
+                if new_interval != frame_interval:
+                    logger.info(f"Inference ~{infer_ms_ewma:.0f} ms, frame_interval {frame_interval} -> {new_interval}")
+                    frame_interval = new_interval
+
+            for cam_id, frame in frames.items():
+                # Use cached annotated frame by default (keeps boxes visible)
+                annotated_frame = cached_annotated_frames.get(cam_id, frame)
+
+                # Overlay Timestamp
+                cv2.putText(annotated_frame, clock_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+                # Store Frame for Streaming (Always update this to keep feed smooth)
+                self.frame_slots[cam_id].write(encode_frame(annotated_frame))
+
+            # Wake the web process's frame watcher, only when someone is streaming
+            if frames and self.stream_viewers.value > 0:
+                self.frame_ready.release()
+
+            time.sleep(0.016) # Yield CPU and limit to ~60 FPS
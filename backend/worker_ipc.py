@@ -0,0 +1,85 @@
+import struct
+import logging
+from importlib.util import find_spec
+from multiprocessing import shared_memory
+
+# The parts of the camera worker the web process needs. Kept free of
+# torch/ultralytics/cv2 imports, those only load in the worker process.
+logger = logging.getLogger("TrafficAI")
+
+# Cheap check, nothing is imported. A broken install still fails inside the
+# worker, which reports it and the analyzer falls back to mock mode.
+AI_AVAILABLE = find_spec("ultralytics") is not None and find_spec("cv2") is not None
+
+FRAME_SIZE = (1024, 576) # (width, height) every camera frame is resized to
+MAX_JPEG_BYTES = FRAME_SIZE[0] * FRAME_SIZE[1] * 3 # A JPEG never outgrows the raw frame
+
+class FrameSlot:
+    """
+    Latest JPEG of one camera in shared memory, written by the worker process
+    and read by the web process without copying frames through a pipe.
+
+    Two buffers and a seqlock-style counter: the writer fills the buffer that
+    is not currently published, then flips the counter. The counter is odd while
+    a write is in progress and frame number N is published once it reaches 2N.
+    """
+    HEADER = struct.Struct("QII") # counter, length of buffer 0, length of buffer 1
+
+    def __init__(self, name=None, capacity=MAX_JPEG_BYTES):
+        size = self.HEADER.size + 2 * capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            try:
+                # The creating process owns cleanup (track= needs Python 3.13+)
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = capacity
+
+    def _counter(self):
+        return struct.unpack_from("Q", self.shm.buf, 0)[0]
+
+    def frame_number(self):
+        """Number of the latest published frame, 0 before the first one."""
+        return self._counter() // 2
+
+    def write(self, data):
+        if len(data) > self.capacity:
+            logger.warning(f"Frame of {len(data)} bytes does not fit the shared slot, dropped.")
+            return
+        counter = self._counter()
+        index = (counter // 2 + 1) % 2 # Buffer of the next frame, never the published one
+        offset = self.HEADER.size + index * self.capacity
+
+        struct.pack_into("Q", self.shm.buf, 0, counter + 1)
+        self.shm.buf[offset:offset + len(data)] = data
+        struct.pack_into("I", self.shm.buf, 8 + 4 * index, len(data))
+        struct.pack_into("Q", self.shm.buf, 0, counter + 2)
+
+    def read(self):
+        """Returns (frame_number, jpeg_bytes), or (0, None) before the first frame."""
+        while True:
+            frame = self.frame_number()
+            if frame == 0:
+                return 0, None
+            index = frame % 2
+            length = struct.unpack_from("I", self.shm.buf, 8 + 4 * index)[0]
+            offset = self.HEADER.size + index * self.capacity
+            data = bytes(self.shm.buf[offset:offset + length])
+
+            # Only valid if the writer has not started reusing this buffer meanwhile
+            if self._counter() <= 2 * frame + 2:
+                return frame, data
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def run_camera_worker(*args):
+    """Process entry point, see backend.camera_worker.CameraWorker for the arguments."""
+    from backend.camera_worker import CameraWorker
+    CameraWorker(*args).run()
@@ -1,5 +1,6 @@
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # New Highway/Road Videos
 files = {
@@ -7,14 +8,18 @@ files = {
     "traffic_cam3.mp4": "https://github.com/intel-iot-devkit/sample-videos/raw/master/car-detection.mp4" # Reverting to car-detection as fallback for cam3, Freewa is definitely highway
 }
 
+ENGINE_MAX_BATCH = 4 # Max cameras per batched inference call (same name in backend/camera_worker.py)
+
 def cleanup_corrupt_files():
     # Force delete potential corrupt model causing blank feed
-    if os.path.exists("yolov8n.pt"):
-        print("Removing existing yolov8n.pt to force fresh download...")
-        try:
-            os.remove("yolov8n.pt")
-        except Exception as e:
-            print(f"Error removing model: {e}")
+    # (the TensorRT engine is built from the .pt, so it has to go too)
+    for model_file in ("yolov8n.pt", "yolov8n.engine"):
+        if os.path.exists(model_file):
+            print(f"Removing existing {model_file} to force fresh download...")
+            try:
+                os.remove(model_file)
+            except Exception as e:
+                print(f"Error removing model: {e}")
 
     # Remove old videos to replace them
     for fname in files.keys():
@@ -25,19 +30,49 @@ def cleanup_corrupt_files():
             except Exception as e:
                 print(f"Error removing {fname}: {e}")
 
-def download_file(url, filename):
+def download_file(session, url, filename):
     print(f"Downloading {filename}...")
     try:
-        r = requests.get(url, stream=True)
+        r = session.get(url, stream=True)
         r.raise_for_status()
         with open(filename, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
+            for chunk in r.iter_content(chunk_size=1 << 20): # 1 MB chunks
                 f.write(chunk)
         print(f"Saved {filename}")
     except Exception as e:
         print(f"Failed to download {filename}: {e}")
 
+def export_tensorrt_engine(weights="yolov8n.pt"):
+    """
+    One-time export of the YOLO weights to a TensorRT FP16 engine.
+    TrafficAnalyzer picks up yolov8n.engine automatically when it exists.
+    Needs an NVIDIA GPU with TensorRT installed, otherwise it is skipped.
+    """
+    try:
+        import torch
+        from ultralytics import YOLO
+    except ImportError as e:
+        print(f"Skipping TensorRT export: {e}")
+        return
+
+    if not torch.cuda.is_available():
+        print("Skipping TensorRT export: no CUDA device found.")
+        return
+
+    print(f"Exporting {weights} to TensorRT (FP16)...")
+    try:
+        # imgsz matches the size used by model.predict() in the analyzer;
+        # dynamic batch so all cameras can share one forward pass
+        engine_path = YOLO(weights).export(format="engine", half=True, imgsz=640,
+                                           dynamic=True, batch=ENGINE_MAX_BATCH, device=0)
+        print(f"Saved {engine_path}")
+    except Exception as e:
+        print(f"Failed to export TensorRT engine: {e}")
+
 if __name__ == "__main__":
     cleanup_corrupt_files()
-    for fname, url in files.items():
-        download_file(url, fname)
+    # All files at once over one pooled session (keep-alive, fewer TLS handshakes)
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(files)) as pool:
+        for fname, url in files.items():
+            pool.submit(download_file, session, url, fname)
+    export_tensorrt_engine()
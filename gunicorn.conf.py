@@ -0,0 +1,10 @@
+# Production server settings, picked up automatically by: gunicorn main:app
+#
+# A single worker process: traffic_system (data store + camera worker process)
+# is a per-process singleton, more workers would each load their own model.
+# Requests are served by a thread pool instead, so long-lived MJPEG streams
+# each hold one thread and never block /api/data polls.
+bind = "0.0.0.0:5000"
+workers = 1
+worker_class = "gthread"
+threads = 16
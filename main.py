@@ -13,7 +13,17 @@ def home():
 
 @app.route('/api/data')
 def get_data():
-    return jsonify(traffic_system.get_latest_data())
+    from flask import request, make_response, Response
+    # Dashboard polls this; skip rebuilding/sending the payload if nothing changed
+    etag = traffic_system.current_etag()
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        # Pre-serialized bytes, shared by every poll until the data changes
+        response = Response(traffic_system.get_latest_json(), mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate with the ETag
+    return response
 
 @app.route('/video_feed/<camera_id>')
 def video_feed(camera_id):
@@ -50,4 +60,6 @@ def chat():
     return jsonify({"response": response})
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    # Development server only, use `gunicorn main:app` in production (see gunicorn.conf.py).
+    # No reloader: it would start a second analyzer, and with it a second camera worker.
+    app.run(debug=True, port=5000, threaded=True, use_reloader=False)